@@ -1,7 +1,9 @@
 import os
 import sys
 import csv
+import bisect
 import datetime
+import statistics
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk, simpledialog, colorchooser
 import traceback
@@ -19,6 +21,24 @@ def center_window(window, width, height):
     y_position = (screen_height - height) // 2
     window.geometry(f"{width}x{height}+{x_position}+{y_position}")
 
+# ---------------------------------------
+# Helper Function to parse HH:MM:SS marker times
+# ---------------------------------------
+def parse_time_str(time_str):
+    parts = time_str.strip().split(':')
+    if len(parts) == 3:
+        hours, minutes, seconds = map(int, parts)
+    elif len(parts) == 2:
+        hours = 0
+        minutes, seconds = map(int, parts)
+    elif len(parts) == 1:
+        hours = 0
+        minutes = 0
+        seconds = int(parts[0])
+    else:
+        raise ValueError(f"Invalid time format: {time_str}")
+    return datetime.timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
 # ---------------------------------------
 # Function 1: Read and display Biopac timings (from readacq.py)
 # ---------------------------------------
@@ -215,23 +235,23 @@ def run_extractbio3():
                     marker_time_utc = event.date_created_utc
                     time_difference = (marker_time_utc - recording_start_utc).total_seconds()
 
+                    days_of_week = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+                    label = full_label
+                    for day in days_of_week:
+                        if day in full_label:
+                            label = full_label.split(day)[0].strip()
+                            break
+
                     if time_difference < 0:
                         problematic_markers.append({
                             'Filename': filename,
-                            'Label': full_label,
+                            'Label': label,
                             'Marker Time': marker_time_utc,
                             'Recording Start Time': recording_start_utc,
                             'Time Difference': time_difference
                         })
                         continue
 
-                    days_of_week = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-                    label = full_label
-                    for day in days_of_week:
-                        if day in full_label:
-                            label = full_label.split(day)[0].strip()
-                            break
-
                     time_str = format_time(time_difference)
                     marker_times.append((label, time_str))
 
@@ -337,6 +357,15 @@ def run_extractbio3():
     # Resolve duplicate markers
     all_data = resolve_duplicates(all_data)
 
+    # Check markers across the whole batch and record issues in each file's Notes
+    qa_index = build_marker_qa_index(all_data)
+    qa_rows = marker_qa_report(qa_index)
+    file_issues = {}
+    for filename, issue, label, detail in qa_rows:
+        file_issues.setdefault(filename, []).append(f"{issue}: {label}" + (f" ({detail})" if detail else ''))
+    for data in all_data:
+        data['Notes'] = '; '.join(file_issues.get(data['Filename'], []))
+
     # Save the extracted data to a CSV file
     output_file = 'output.csv'
     with open(output_file, mode='w', newline='') as csv_file:
@@ -359,7 +388,211 @@ def run_extractbio3():
                 row.append(times[0] if times else '')
             csv_writer.writerow(row)
 
-    messagebox.showinfo("Success", f"Extracted data saved to {output_file}")
+        # Notes must stay the last row; the Kubios function stops reading markers there
+        csv_writer.writerow(['Notes'] + [data['Notes'] for data in all_data])
+
+    qa_file = 'marker_qa.csv'
+    with open(qa_file, mode='w', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(['Filename', 'Issue', 'Label', 'Detail'])
+        csv_writer.writerows(qa_rows)
+
+    flagged_files = len({row[0] for row in qa_rows})
+    messagebox.showinfo("Success", f"Extracted data saved to {output_file}\n"
+                                   f"Marker QA: {len(qa_rows)} issue(s) in {flagged_files} file(s), see {qa_file}")
+
+
+# ---------------------------------------
+# Marker QA index: cohort-wide checks on extracted markers
+# ---------------------------------------
+def offset_fences(sorted_offsets, min_spread_seconds, factor=1.5):
+    # Tukey fences; too few samples to judge an outlier gives no fences.
+    # The spread has a floor so whole-second rounding jitter is not flagged.
+    if len(sorted_offsets) < 4:
+        return None
+    q1, _, q3 = statistics.quantiles(sorted_offsets, n=4)
+    spread = max(q3 - q1, min_spread_seconds)
+    return q1 - factor * spread, q3 + factor * spread
+
+def in_order_labels(labels, offsets):
+    # Longest run of labels (in expected order) whose offsets never decrease;
+    # anything outside it is the marker that is out of place
+    tails = []
+    tail_labels = []
+    previous = {}
+    for label in labels:
+        pos = bisect.bisect_right(tails, offsets[label])
+        previous[label] = tail_labels[pos - 1] if pos else None
+        if pos == len(tails):
+            tails.append(offsets[label])
+            tail_labels.append(label)
+        else:
+            tails[pos] = offsets[label]
+            tail_labels[pos] = label
+    keep = set()
+    label = tail_labels[-1] if tail_labels else None
+    while label is not None:
+        keep.add(label)
+        label = previous[label]
+    return keep
+
+def build_marker_qa_index(all_data, expected_fraction=0.5, min_spread_seconds=10):
+    # Build once per batch from the extracted data; queries below never touch the .acq files
+    file_offsets = {}
+    file_negative = {}
+    duplicates = []
+    negative = []
+    label_offsets = {}
+    label_files = {}
+    for data in all_data:
+        filename = data['Filename']
+        offsets = {}
+        times_by_label = {}
+        for label, time_str in data['Marker Times']:
+            times_by_label.setdefault(label, []).append(time_str)
+        for label, times in times_by_label.items():
+            if len(times) > 1:
+                duplicates.append((filename, label, times))
+            # First time, as written to output.csv
+            offsets[label] = int(parse_time_str(times[0]).total_seconds())
+            label_offsets.setdefault(label, []).append(offsets[label])
+        file_offsets[filename] = offsets
+
+        negative_labels = set()
+        for marker in data.get('Problematic Markers', []):
+            negative.append((filename, marker['Label'], marker['Time Difference']))
+            negative_labels.add(marker['Label'])
+        file_negative[filename] = negative_labels
+
+        for label in set(offsets) | negative_labels:
+            label_files[label] = label_files.get(label, 0) + 1
+
+    label_stats = {}
+    for label, offsets in label_offsets.items():
+        offsets.sort()
+        label_stats[label] = {
+            'count': len(offsets),
+            'median': statistics.median(offsets),
+            'fences': offset_fences(offsets, min_spread_seconds),
+        }
+
+    # A label is expected only if enough of the cohort has it; rarer labels are reported as unexpected
+    min_files = expected_fraction * len(all_data)
+    expected_labels = {label for label, count in label_files.items() if count >= min_files}
+
+    # Expected section order is the order of the cohort's median offsets
+    label_order = sorted((label for label in label_stats if label in expected_labels),
+                         key=lambda label: label_stats[label]['median'])
+
+    # Gaps are only measured between in-order markers, so a misplaced marker
+    # is reported once as out of order rather than again as a negative gap
+    file_in_order = {}
+    gap_offsets = {}
+    for filename, offsets in file_offsets.items():
+        present = [label for label in label_order if label in offsets]
+        keep = in_order_labels(present, offsets)
+        file_in_order[filename] = [label for label in present if label in keep]
+        in_order = file_in_order[filename]
+        for first, second in zip(in_order, in_order[1:]):
+            gap_offsets.setdefault((first, second), []).append(offsets[second] - offsets[first])
+    gap_fences = {}
+    for pair, gaps in gap_offsets.items():
+        gaps.sort()
+        gap_fences[pair] = offset_fences(gaps, min_spread_seconds)
+
+    return {
+        'file_offsets': file_offsets,
+        'file_negative': file_negative,
+        'label_offsets': label_offsets,
+        'label_stats': label_stats,
+        'label_order': label_order,
+        'file_in_order': file_in_order,
+        'expected_labels': expected_labels,
+        'gap_fences': gap_fences,
+        'negative': negative,
+        'duplicates': duplicates,
+    }
+
+def find_missing_markers(index):
+    missing = []
+    for filename, offsets in index['file_offsets'].items():
+        for label in index['label_order']:
+            if label not in offsets and label not in index['file_negative'][filename]:
+                missing.append((filename, label))
+    return missing
+
+def find_unexpected_labels(index):
+    unexpected = []
+    for filename, offsets in index['file_offsets'].items():
+        for label in offsets:
+            if label not in index['expected_labels']:
+                unexpected.append((filename, label))
+    return unexpected
+
+def find_negative_markers(index):
+    return list(index['negative'])
+
+def find_duplicate_markers(index):
+    return list(index['duplicates'])
+
+def find_out_of_order_markers(index):
+    out_of_order = []
+    for filename, offsets in index['file_offsets'].items():
+        present = [label for label in index['label_order'] if label in offsets]
+        keep = set(index['file_in_order'][filename])
+        for position, label in enumerate(present):
+            if label in keep:
+                continue
+            earlier = [lbl for lbl in present[:position] if lbl in keep]
+            later = [lbl for lbl in present[position + 1:] if lbl in keep]
+            if earlier:
+                out_of_order.append((filename, label, f"expected after {earlier[-1]}"))
+            else:
+                out_of_order.append((filename, label, f"expected before {later[0]}"))
+    return out_of_order
+
+def find_outlier_markers(index):
+    outliers = []
+    for filename, offsets in index['file_offsets'].items():
+        in_order = set(index['file_in_order'][filename])
+        for label, seconds in offsets.items():
+            # Out-of-order markers are already reported; don't report them again as outliers
+            if label in index['expected_labels'] and label not in in_order:
+                continue
+            fences = index['label_stats'][label]['fences']
+            if fences and not fences[0] <= seconds <= fences[1]:
+                outliers.append((filename, label, seconds, index['label_stats'][label]['median']))
+    return outliers
+
+def find_outlier_gaps(index):
+    outliers = []
+    for filename, offsets in index['file_offsets'].items():
+        in_order = index['file_in_order'][filename]
+        for first, second in zip(in_order, in_order[1:]):
+            fences = index['gap_fences'].get((first, second))
+            gap = offsets[second] - offsets[first]
+            if fences and not fences[0] <= gap <= fences[1]:
+                outliers.append((filename, first, second, gap))
+    return outliers
+
+def marker_qa_report(index):
+    # One row per issue: (Filename, Issue, Label, Detail)
+    rows = []
+    for filename, label, seconds in find_negative_markers(index):
+        rows.append((filename, 'Before Segment 1', label, f"{seconds:.0f}s"))
+    for filename, label, times in find_duplicate_markers(index):
+        rows.append((filename, 'Unresolved duplicate', label, f"kept {times[0]} of {', '.join(times)}"))
+    for filename, label in find_missing_markers(index):
+        rows.append((filename, 'Missing', label, ''))
+    for filename, label in find_unexpected_labels(index):
+        rows.append((filename, 'Unexpected label', label, ''))
+    for filename, label, detail in find_out_of_order_markers(index):
+        rows.append((filename, 'Out of order', label, detail))
+    for filename, label, seconds, median in find_outlier_markers(index):
+        rows.append((filename, 'Outlier offset', label, f"{seconds}s (cohort median {median:.0f}s)"))
+    for filename, first, second, gap in find_outlier_gaps(index):
+        rows.append((filename, 'Outlier gap', f"{first} -> {second}", f"{gap}s"))
+    return rows
 
 
 
@@ -540,21 +773,6 @@ def run_ktime():
                     times[label] = time_str
             file_times[filename] = times
 
-        def parse_time_str(time_str):
-            parts = time_str.strip().split(':')
-            if len(parts) == 3:
-                hours, minutes, seconds = map(int, parts)
-            elif len(parts) == 2:
-                hours = 0
-                minutes, seconds = map(int, parts)
-            elif len(parts) == 1:
-                hours = 0
-                minutes = 0
-                seconds = int(parts[0])
-            else:
-                raise ValueError(f"Invalid time format: {time_str}")
-            return datetime.timedelta(hours=hours, minutes=minutes, seconds=seconds)
-
         def format_timedelta(tdelta):
             total_seconds = int(tdelta.total_seconds())
             hours, remainder = divmod(total_seconds, 3600)
@@ -0,0 +1,101 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("tkinter")
+pytest.importorskip("bioread")
+pytest.importorskip("dateutil")
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+import biokubios  # noqa: E402
+
+
+def fmt(seconds):
+    return f"{seconds // 3600:02}:{seconds % 3600 // 60:02}:{seconds % 60:02}"
+
+
+def make_file(filename, markers, problematic=()):
+    return {
+        'Filename': filename,
+        'Recording Date': '2024-01-01 09:00',
+        'Marker Times': [(label, fmt(seconds)) for label, seconds in markers],
+        'Notes': '',
+        'Problematic Markers': [{'Label': label, 'Time Difference': diff} for label, diff in problematic],
+    }
+
+
+def cohort(count=6, jitter=3):
+    return [make_file(f"p{i}", [('A', 60 + i * jitter), ('B', 600 + i * jitter),
+                                ('C', 1200 + i * jitter), ('D', 1800 + i * jitter)])
+            for i in range(count)]
+
+
+def issues(all_data, **kwargs):
+    return biokubios.marker_qa_report(biokubios.build_marker_qa_index(all_data, **kwargs))
+
+
+def test_clean_cohort_has_no_issues():
+    assert issues(cohort()) == []
+
+
+def test_rare_label_is_unexpected_not_missing_everywhere():
+    all_data = cohort()
+    all_data.append(make_file('typo', [('A', 60), ('Bb', 600), ('C', 1200), ('D', 1800)]))
+    assert issues(all_data) == [
+        ('typo', 'Missing', 'B', ''),
+        ('typo', 'Unexpected label', 'Bb', ''),
+    ]
+
+
+def test_expected_fraction_is_configurable():
+    all_data = cohort()
+    all_data.append(make_file('extra', [('A', 60), ('B', 600), ('C', 1200), ('D', 1800), ('E', 2400)]))
+    index = biokubios.build_marker_qa_index(all_data, expected_fraction=0.1)
+    assert ('p0', 'E') in biokubios.find_missing_markers(index)
+    assert biokubios.find_unexpected_labels(index) == []
+
+
+def test_negative_marker_is_not_also_missing():
+    all_data = cohort()
+    all_data.append(make_file('neg', [('B', 600), ('C', 1200), ('D', 1800)], problematic=[('A', -30.0)]))
+    index = biokubios.build_marker_qa_index(all_data)
+    assert biokubios.find_negative_markers(index) == [('neg', 'A', -30.0)]
+    assert biokubios.find_missing_markers(index) == []
+
+
+def test_late_first_marker_is_the_one_out_of_order():
+    all_data = cohort()
+    all_data.append(make_file('late', [('A', 1500), ('B', 600), ('C', 1200), ('D', 1800)]))
+    assert issues(all_data) == [('late', 'Out of order', 'A', 'expected before B')]
+
+
+def test_swapped_middle_marker_is_out_of_order():
+    all_data = cohort()
+    all_data.append(make_file('swap', [('A', 60), ('B', 1500), ('C', 1200), ('D', 1800)]))
+    assert issues(all_data) == [('swap', 'Out of order', 'B', 'expected after A')]
+
+
+def test_outlier_offset_and_gap():
+    all_data = cohort()
+    all_data.append(make_file('slow', [('A', 60), ('B', 600), ('C', 2400), ('D', 3000)]))
+    index = biokubios.build_marker_qa_index(all_data)
+    assert [(f, label) for f, label, _, _ in biokubios.find_outlier_markers(index)] == [
+        ('slow', 'C'), ('slow', 'D')]
+    assert [(f, first, second) for f, first, second, _ in biokubios.find_outlier_gaps(index)] == [
+        ('slow', 'B', 'C')]
+
+
+def test_rounding_jitter_is_not_an_outlier():
+    all_data = cohort(jitter=0)
+    all_data.append(make_file('jitter', [('A', 62), ('B', 601), ('C', 1199), ('D', 1802)]))
+    assert issues(all_data) == []
+
+
+def test_unresolved_duplicate_is_reported():
+    all_data = cohort()
+    all_data.append(make_file('dup', [('A', 60), ('B', 600), ('B', 900), ('C', 1200), ('D', 1800)]))
+    index = biokubios.build_marker_qa_index(all_data)
+    assert biokubios.find_duplicate_markers(index) == [('dup', 'B', ['00:10:00', '00:15:00'])]
+    assert index['file_offsets']['dup']['B'] == 600